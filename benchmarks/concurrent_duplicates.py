@@ -0,0 +1,75 @@
+"""
+并发重复检测验证
+向运行中的服务并发提交相同用户名（或相同邮箱）的创建请求，
+验证只有一个请求成功，其余全部返回400而不是500
+
+用法:
+    python benchmarks/concurrent_duplicates.py --base-url http://localhost:5000 --concurrency 32
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+
+def post_user(url: str, payload: Dict[str, str]) -> Tuple[int, str]:
+    """提交创建用户请求，返回状态码和错误信息"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, ''
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode() or '{}').get('error', '')
+
+
+def run_case(url: str, payloads: List[Dict[str, str]], expected_error: str) -> bool:
+    """并发提交一组请求并检查结果"""
+    with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+        results = list(executor.map(lambda payload: post_user(url, payload), payloads))
+
+    statuses = Counter(status for status, _ in results)
+    errors = Counter(error for status, error in results if status == 400)
+    ok = statuses[201] == 1 and statuses[400] == len(payloads) - 1 and set(errors) <= {expected_error}
+    print(f"{'✅' if ok else '❌'} 状态码分布: {dict(statuses)}  错误信息: {dict(errors)}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='并发创建重复用户，验证唯一性检查')
+    parser.add_argument('--base-url', default='http://localhost:5000', help='服务地址')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发请求数')
+    args = parser.parse_args()
+
+    url = f'{args.base_url}/api/users'
+    suffix = str(int(time.time() * 1000))
+
+    print('相同用户名:')
+    same_username = [
+        {'username': f'dup_{suffix}', 'email': f'dup_{suffix}_{i}@example.com'}
+        for i in range(args.concurrency)
+    ]
+    username_ok = run_case(url, same_username, '用户名已存在')
+
+    print('相同邮箱:')
+    same_email = [
+        {'username': f'dup_{suffix}_{i}', 'email': f'dup_{suffix}@example.com'}
+        for i in range(args.concurrency)
+    ]
+    email_ok = run_case(url, same_email, '邮箱已存在')
+
+    return 0 if username_ok and email_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+列表接口内存基准测试
+分别用原先的ORM实例方式（Model.query.paginate + to_dict）和当前的行元组方式
+（GET /api/products、/api/users）返回一页数据，每次测量在全新的Python进程中进行，
+输出单次请求的峰值RSS增量、耗时和响应大小，并校验两种方式返回的数据一致
+
+用法:
+    python benchmarks/list_memory.py --rows 1000 10000 100000
+    python benchmarks/list_memory.py --model users --database-url postgresql+psycopg2://...
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行：先用小页预热，再测量一页per_page行的峰值RSS增量
+PROBE = '''
+import hashlib, json, resource, sys, time
+import run
+from flask import jsonify
+from models import User, Product
+
+model_name, mode, per_page = sys.argv[1], sys.argv[2], int(sys.argv[3])
+model = {'users': User, 'products': Product}[model_name]
+app = run.app
+client = app.test_client()
+
+def request_page(size):
+    if mode == 'rows':
+        response = client.get(f'/api/{model_name}?per_page={size}')
+        return response.get_data(), response.get_json()['data']
+    with app.test_request_context():
+        page = model.query.paginate(page=1, per_page=size, error_out=False)
+        data = [item.to_dict() for item in page.items]
+        body = jsonify({'success': True, 'data': data}).get_data()
+    return body, data
+
+request_page(10)
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+body, data = request_page(per_page)
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'peak_kb': peak - baseline,
+    'elapsed_ms': elapsed * 1000,
+    'bytes': len(body),
+    'count': len(data),
+    'digest': hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+}))
+'''
+
+# 在子进程中执行：迁移数据库并补足测试数据
+SEED = '''
+import sys
+from datetime import datetime
+from flask_migrate import upgrade
+from sqlalchemy import func, insert, select
+import run
+from models import db, User, Product
+
+model_name, rows, directory = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+with run.app.app_context():
+    upgrade(directory=directory)
+    model = {'users': User, 'products': Product}[model_name]
+    existing = db.session.execute(select(func.count()).select_from(model)).scalar()
+    now = datetime.utcnow()
+    for start in range(existing, rows, 5000):
+        if model is User:
+            values = [
+                {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'full_name': f'Bench User {i}',
+                 'is_active': True, 'created_at': now, 'updated_at': now}
+                for i in range(start, min(start + 5000, rows))
+            ]
+        else:
+            values = [
+                {'name': f'Bench Product {i}', 'description': 'benchmark ' * 50, 'price': i % 1000 + 0.99,
+                 'stock_quantity': i % 100, 'category': f'cat_{i % 20}', 'is_available': True,
+                 'created_at': now, 'updated_at': now}
+                for i in range(start, min(start + 5000, rows))
+            ]
+        db.session.execute(insert(model), values)
+        db.session.commit()
+'''
+
+
+def run_script(script: str, args: list, env: dict) -> str:
+    return subprocess.check_output(
+        [sys.executable, '-c', script, *map(str, args)], cwd=PROJECT_ROOT, env=env
+    ).decode()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='测量列表接口单次请求的峰值内存')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='每页行数')
+    parser.add_argument('--model', choices=['products', 'users'], default='products', help='测试的列表接口')
+    parser.add_argument('--database-url', default=None, help='数据库地址，默认使用临时SQLite文件')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'list_memory.db')}"
+    env = dict(os.environ, DATABASE_URL=database_url, RATELIMIT_ENABLED='false', PROFILER_ENABLED='false')
+
+    print(f'准备 {max(args.rows)} 行测试数据: {database_url}')
+    run_script(SEED, [args.model, max(args.rows), os.path.join(PROJECT_ROOT, 'migrations')], env)
+
+    ok = True
+    print(f"{'行数':>8} {'方式':>6} {'峰值RSS增量(MB)':>16} {'耗时(ms)':>10} {'响应(MB)':>10}")
+    for rows in args.rows:
+        results = {}
+        for mode in ('orm', 'rows'):
+            result = json.loads(run_script(PROBE, [args.model, mode, rows], env).strip().splitlines()[-1])
+            results[mode] = result
+            print(f"{rows:>8} {mode:>6} {result['peak_kb'] / 1024:>16.1f} "
+                  f"{result['elapsed_ms']:>10.1f} {result['bytes'] / 1024 / 1024:>10.1f}")
+        if results['orm']['digest'] != results['rows']['digest']:
+            print(f'❌ {rows} 行时两种方式返回的数据不一致')
+            ok = False
+
+    if ok:
+        print('✅ 两种方式返回的数据一致')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+服务模式基准测试
+在高并发下对比同步worker(gunicorn sync)与多线程worker(gunicorn gthread)的吞吐量和延迟
+
+用法:
+    python benchmarks/serving_modes.py --path /api/users/1 --concurrency 64 --requests 5000
+
+需要可用的PostgreSQL和Redis（与应用相同的环境变量配置）
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 两种服务模式都使用gunicorn.conf.py启动，只有每个worker的线程数不同
+SERVER_COMMAND = ['gunicorn', '--config', 'gunicorn.conf.py', '--bind', '127.0.0.1:{port}', 'run:app']
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    """等待服务端口可连接"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'服务在{timeout}秒内未启动: 端口{port}')
+
+
+def fetch(url: str) -> float:
+    """发送一次请求，返回耗时（秒），失败时返回负数"""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            response.read()
+    except (urllib.error.URLError, OSError):
+        return -1.0
+    return time.perf_counter() - start
+
+
+def run_load(url: str, concurrency: int, total: int) -> Dict[str, float]:
+    """以指定并发数压测，返回统计结果"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results: List[float] = list(executor.map(fetch, [url] * total))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r for r in results if r >= 0)
+    errors = total - len(latencies)
+    if not latencies:
+        return {'rps': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'errors': errors}
+
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'errors': errors
+    }
+
+
+def benchmark_mode(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    """启动指定模式的服务并压测"""
+    command = [part.format(port=args.port) for part in SERVER_COMMAND]
+    env = dict(
+        os.environ,
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads if mode == 'gthread' else 1)
+    )
+    server = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+    try:
+        wait_for_port(args.port)
+        url = f'http://127.0.0.1:{args.port}{args.path}'
+        # 预热，避免把连接建立和首次导入计入结果
+        run_load(url, min(args.concurrency, 8), 50)
+        return run_load(url, args.concurrency, args.requests)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='对比同步与gthread服务模式')
+    parser.add_argument('--path', default='/api/users/1', help='压测的接口路径')
+    parser.add_argument('--concurrency', type=int, default=64, help='并发请求数')
+    parser.add_argument('--requests', type=int, default=5000, help='总请求数')
+    parser.add_argument('--workers', type=int, default=4, help='服务worker进程数')
+    parser.add_argument('--threads', type=int, default=16, help='gthread模式下每个worker的线程数')
+    parser.add_argument('--port', type=int, default=5055, help='服务监听端口')
+    parser.add_argument('--modes', default='sync,gthread', help='要测试的模式，逗号分隔')
+    args = parser.parse_args()
+
+    print(f'接口: {args.path}  并发: {args.concurrency}  请求数: {args.requests}  '
+          f'workers: {args.workers}  gthread线程数: {args.threads}')
+    print(f"{'模式':<8}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'错误':>8}")
+    for mode in args.modes.split(','):
+        result = benchmark_mode(mode, args)
+        print(
+            f"{mode:<8}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+            f"{result['p99_ms']:>10.1f}{result['errors']:>8}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
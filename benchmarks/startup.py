@@ -0,0 +1,77 @@
+"""
+启动耗时基准测试
+在全新的Python进程中测量导入run.py（即创建应用）的耗时，
+并检查导入过程中没有建立任何网络连接，保证worker重启足够轻量
+
+用法:
+    python benchmarks/startup.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行：统计导入耗时和socket连接次数
+PROBE = '''
+import json, socket, time
+connects = []
+_connect = socket.socket.connect
+def connect(self, address):
+    connects.append(str(address))
+    return _connect(self, address)
+socket.socket.connect = connect
+
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+import run
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (finished - imported) * 1000,
+    'total_ms': (finished - started) * 1000,
+    'connects': connects
+}))
+'''
+
+
+def probe_once() -> dict:
+    """在新进程中测量一次启动"""
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE], cwd=PROJECT_ROOT, env=os.environ.copy()
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='测量应用启动耗时')
+    parser.add_argument('--runs', type=int, default=20, help='测量次数')
+    parser.add_argument('--budget-ms', type=float, default=0, help='总耗时中位数上限，超出则返回非零')
+    args = parser.parse_args()
+
+    results = [probe_once() for _ in range(args.runs)]
+    connects = sorted({address for result in results for address in result['connects']})
+
+    for key in ('import_ms', 'create_app_ms', 'total_ms'):
+        values = [result[key] for result in results]
+        print(f'{key:<15} 中位数 {statistics.median(values):8.1f}  最大 {max(values):8.1f}')
+
+    if connects:
+        print(f'❌ 启动过程中建立了网络连接: {connects}')
+        return 1
+    print('✅ 启动过程中没有建立网络连接')
+
+    median_total = statistics.median(result['total_ms'] for result in results)
+    if args.budget_ms and median_total > args.budget_ms:
+        print(f'❌ 启动耗时中位数 {median_total:.1f}ms 超出预算 {args.budget_ms:.1f}ms')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+缓存一致性
+通过SQLAlchemy会话事件收集事务中变更的User/Product/Order，提交成功后用一个Redis流水线
+统一写入或删除对应的缓存；Redis调用失败时把缓存键写入数据库发件箱，由每个worker的
+后台线程定时重试删除（不论记录由哪个进程写入），保证过期缓存不会因为一次Redis故障而一直存在
+"""
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from typing import Dict, List, Optional
+import click
+import json
+import threading
+import time
+
+from extensions import redis_client
+from models import db, User, Product, Order, CacheOutbox
+
+# 需要维护缓存的模型及其缓存键前缀
+CACHED_MODELS = {
+    User: 'user',
+    Product: 'product',
+    Order: 'order'
+}
+
+# 本进程是否写过发件箱，写过则在下次Redis调用成功后顺带清理，不必等定时清理
+_outbox_pending = False
+
+# 启动定时清理线程时加锁，保证每个进程中每个应用只启动一个
+_drainer_lock = threading.Lock()
+
+def cache_key(instance) -> str:
+    """模型实例对应的缓存键"""
+    return f"{CACHED_MODELS[type(instance)]}:{instance.id}"
+
+def serialize(instance) -> str:
+    """缓存中保存的内容与接口返回的to_dict()一致"""
+    return json.dumps(instance.to_dict(), default=str)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """记录本次flush中变更的实例，此时实例状态完整，序列化不会触发额外查询"""
+    pending: Dict[str, Optional[str]] = session.info.setdefault('cache_pending', {})
+    for instance in session.new:
+        if type(instance) in CACHED_MODELS:
+            pending[cache_key(instance)] = serialize(instance)
+    for instance in session.dirty:
+        if type(instance) in CACHED_MODELS and session.is_modified(instance, include_collections=False):
+            pending[cache_key(instance)] = serialize(instance)
+    for instance in session.deleted:
+        if type(instance) in CACHED_MODELS:
+            pending[cache_key(instance)] = None
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    """事务提交后一次性更新缓存"""
+    pending = session.info.pop('cache_pending', None)
+    if pending and has_app_context():
+        apply_cache_changes(pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    """事务回滚时丢弃收集到的变更"""
+    session.info.pop('cache_pending', None)
+
+def apply_cache_changes(pending: Dict[str, Optional[str]]):
+    """在一个Redis流水线中写入/删除缓存，失败时写入发件箱"""
+    global _outbox_pending
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in pending.items():
+            if value is None:
+                pipe.delete(key)
+            else:
+                pipe.setex(key, current_app.config['CACHE_TTL'], value)
+        pipe.execute()
+    except RedisError as e:
+        print(f"缓存更新失败，写入发件箱: {e}")
+        write_outbox(list(pending))
+        return
+
+    if _outbox_pending:
+        drain_outbox()
+
+def write_outbox(keys: List[str]):
+    """记录待删除的缓存键，使用独立连接，不受当前会话状态影响"""
+    global _outbox_pending
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert(CacheOutbox), [{'key': key} for key in keys])
+        _outbox_pending = True
+    except Exception as e:
+        print(f"缓存发件箱写入失败: {e}")
+
+def drain_outbox(batch_size: int = 500) -> int:
+    """删除发件箱中记录的缓存键，返回处理的数量"""
+    global _outbox_pending
+    drained = 0
+    try:
+        while True:
+            with db.engine.begin() as connection:
+                rows = connection.execute(
+                    select(CacheOutbox.id, CacheOutbox.key).order_by(CacheOutbox.id).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                redis_client.delete(*{row.key for row in rows})
+                connection.execute(delete(CacheOutbox).where(CacheOutbox.id.in_([row.id for row in rows])))
+            drained += len(rows)
+        _outbox_pending = False
+    except Exception as e:
+        print(f"缓存发件箱清理失败: {e}")
+    return drained
+
+def _drain_periodically(app: Flask, interval: float):
+    """定时清理发件箱，发件箱为空时每次只有一条按主键的查询"""
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            drain_outbox()
+
+def _start_outbox_drainer():
+    """第一个请求到来时启动定时清理线程
+
+    在请求中启动而不是在create_app中启动：preload_app模式下应用在master进程中创建，
+    线程不会随fork进入worker，且启动过程本身不访问数据库
+    """
+    app = current_app._get_current_object()
+    if 'cache_outbox_drainer' in app.extensions:
+        return
+    with _drainer_lock:
+        if 'cache_outbox_drainer' in app.extensions:
+            return
+        thread = threading.Thread(
+            target=_drain_periodically,
+            args=(app, app.config['CACHE_OUTBOX_DRAIN_INTERVAL']),
+            name='cache-outbox-drainer',
+            daemon=True
+        )
+        app.extensions['cache_outbox_drainer'] = thread
+    thread.start()
+
+def init_cache_coherence(app: Flask):
+    """注册发件箱清理命令 flask cache drain-outbox，按配置启用每个worker的定时清理"""
+    if app.config['CACHE_OUTBOX_DRAIN_INTERVAL'] > 0:
+        app.before_request(_start_outbox_drainer)
+
+    @app.cli.group('cache')
+    def cache_group():
+        """缓存维护命令"""
+
+    @cache_group.command('drain-outbox')
+    def drain_outbox_command():
+        """重试删除发件箱中的缓存键"""
+        click.echo(f'已清理 {drain_outbox()} 个缓存键')
@@ -0,0 +1,193 @@
+"""
+缓存预热
+get_user 读取到用户（缓存命中或数据库查到）时按小时记录访问次数（有序集合），
+预热时合并最近若干小时的访问记录得到热点用户；Redis被清空、访问记录随之丢失时，
+改用日志表中的访问记录。热点用户按分块 IN 查询批量读取，用流水线写入缓存，
+并按 CACHE_WARMUP_RATE 控制速度，避免预热本身压垮主库
+"""
+
+from flask import Flask, current_app
+from sqlalchemy import func, select
+from redis.commands.core import Script
+from redis.exceptions import RedisError
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import click
+import json
+import threading
+import time
+
+from cache_coherence import cache_key, serialize
+from extensions import redis_client
+from models import db, User, LogEntry
+
+# 按小时记录访问次数的有序集合键前缀
+HOT_KEY_PREFIX = 'cache:hot:user:'
+
+# 读取缓存，键存在时才累加访问次数
+GET_AND_TRACK_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('ZINCRBY', KEYS[2], 1, ARGV[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+return value
+"""
+
+# 预热标记：存在表示最近预热过且Redis之后没有被清空，启动时的后台预热据此跳过
+WARMUP_MARKER = 'cache:warmup:user'
+
+# 热点用户来源
+SOURCE_NAMES = {
+    'redis': 'Redis访问记录',
+    'logs': '日志表'
+}
+
+# 本进程是否已启动过后台预热
+_boot_started = False
+_boot_lock = threading.Lock()
+
+def hot_key(at: Optional[datetime] = None) -> str:
+    """某个小时的访问记录键"""
+    return HOT_KEY_PREFIX + (at or datetime.utcnow()).strftime('%Y%m%d%H')
+
+def hot_key_ttl() -> int:
+    """访问记录键的过期时间，覆盖整个统计窗口"""
+    return (current_app.config['CACHE_WARMUP_WINDOW'] + 1) * 3600
+
+def get_and_track_script() -> Script:
+    """当前应用的读取并记录访问脚本，首次使用时注册，之后复用同一个Script对象"""
+    script = current_app.extensions.get('redis_get_and_track')
+    if script is None:
+        script = redis_client.register_script(GET_AND_TRACK_SCRIPT)
+        current_app.extensions['redis_get_and_track'] = script
+    return script
+
+def get_cached_user(user_id: int) -> Optional[str]:
+    """读取用户缓存，命中时记录一次访问，在一次Redis往返中完成
+
+    只统计确实存在的用户：未命中时不记录，由 cache_user 在数据库查到用户后记录，
+    扫描不存在的ID不会让访问记录无限增长
+    """
+    return get_and_track_script()(
+        keys=[f'user:{user_id}', hot_key()],
+        args=[user_id, hot_key_ttl()]
+    )
+
+def cache_user(user_id: int, user_data: Dict[str, Any]):
+    """写入从数据库查到的用户并记录一次访问，在同一个流水线中发送"""
+    key = hot_key()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.setex(f'user:{user_id}', current_app.config['CACHE_TTL'], json.dumps(user_data))
+    pipe.zincrby(key, 1, user_id)
+    pipe.expire(key, hot_key_ttl())
+    pipe.execute()
+
+def hot_user_ids_from_redis(limit: int, window: int) -> List[int]:
+    """合并最近window小时的访问记录，按访问次数取前limit个用户"""
+    now = datetime.utcnow()
+    keys = [hot_key(now - timedelta(hours=hours)) for hours in range(window)]
+    union_key = HOT_KEY_PREFIX + 'union'
+    # MULTI保证并发预热不会互相覆盖临时键
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zunionstore(union_key, keys)
+    pipe.zrevrange(union_key, 0, limit - 1)
+    pipe.delete(union_key)
+    return [int(user_id) for user_id in pipe.execute()[1]]
+
+def hot_user_ids_from_logs(limit: int, window: int) -> List[int]:
+    """从日志表统计最近window小时内被查看最多的用户"""
+    since = datetime.utcnow() - timedelta(hours=window)
+    return db.session.execute(
+        select(LogEntry.user_id).where(
+            LogEntry.module == 'api.get_user',
+            LogEntry.user_id.isnot(None),
+            LogEntry.created_at >= since
+        ).group_by(LogEntry.user_id).order_by(func.count().desc()).limit(limit)
+    ).scalars().all()
+
+def warm_users(user_ids: List[int]) -> int:
+    """分块加载用户并写入缓存，返回新写入的缓存数量"""
+    config = current_app.config
+    chunk_size = config['CACHE_WARMUP_CHUNK']
+    warmed = 0
+    for offset in range(0, len(user_ids), chunk_size):
+        started = time.monotonic()
+        chunk = user_ids[offset:offset + chunk_size]
+
+        users = db.session.execute(select(User).where(User.id.in_(chunk))).scalars().all()
+        pipe = redis_client.pipeline(transaction=False)
+        for user in users:
+            # 只写入不存在的键，不覆盖预热期间写请求更新过的缓存
+            pipe.set(cache_key(user), serialize(user), ex=config['CACHE_TTL'], nx=True)
+        warmed += sum(1 for result in pipe.execute() if result)
+        # 只读不写，及时释放已加载的实例
+        db.session.expunge_all()
+
+        # 按速率限制补足本批次的耗时
+        delay = len(chunk) / config['CACHE_WARMUP_RATE'] - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
+    return warmed
+
+def run_warmup(limit: Optional[int] = None) -> Tuple[str, int, int]:
+    """预热热点用户缓存，返回热点来源、热点用户数量和新写入的缓存数量"""
+    config = current_app.config
+    limit = limit or config['CACHE_WARMUP_LIMIT']
+    window = config['CACHE_WARMUP_WINDOW']
+
+    source = 'redis'
+    user_ids = hot_user_ids_from_redis(limit, window)
+    if not user_ids:
+        source = 'logs'
+        user_ids = hot_user_ids_from_logs(limit, window)
+    return source, len(user_ids), warm_users(user_ids)
+
+def _warmup_in_background(app: Flask):
+    """后台预热，整个部署中只有抢到预热标记的一个进程执行"""
+    with app.app_context():
+        try:
+            if not redis_client.set(WARMUP_MARKER, datetime.utcnow().isoformat(), nx=True, ex=app.config['CACHE_TTL']):
+                return
+            source, found, warmed = run_warmup()
+            print(f"缓存预热完成: 从{SOURCE_NAMES[source]}找到 {found} 个热点用户，写入 {warmed} 个缓存")
+        except Exception as e:
+            print(f"缓存预热失败: {e}")
+            try:
+                redis_client.delete(WARMUP_MARKER)
+            except RedisError:
+                pass
+
+def _start_boot_warmup():
+    """第一个请求到来时启动后台预热线程，启动过程本身不访问Redis和数据库"""
+    global _boot_started
+    if _boot_started:
+        return
+    with _boot_lock:
+        if _boot_started:
+            return
+        _boot_started = True
+    threading.Thread(
+        target=_warmup_in_background,
+        args=(current_app._get_current_object(),),
+        name='cache-warmup',
+        daemon=True
+    ).start()
+
+def init_cache_warmup(app: Flask):
+    """注册预热命令 flask cache warm，按配置启用启动后的后台预热
+
+    需在 init_cache_coherence 之后调用，命令注册在其创建的 cache 命令组下
+    """
+    if app.config['CACHE_WARMUP_ON_BOOT']:
+        app.before_request(_start_boot_warmup)
+
+    cache_group = app.cli.commands['cache']
+
+    @cache_group.command('warm')
+    @click.option('--limit', type=int, default=None, help='预热的热点用户数，默认CACHE_WARMUP_LIMIT')
+    def warm_command(limit: Optional[int]):
+        """按访问热度预热用户缓存"""
+        source, found, warmed = run_warmup(limit)
+        redis_client.set(WARMUP_MARKER, datetime.utcnow().isoformat(), ex=current_app.config['CACHE_TTL'])
+        click.echo(f'从{SOURCE_NAMES[source]}找到 {found} 个热点用户，写入 {warmed} 个缓存')
@@ -4,8 +4,101 @@
 """
 
 import os
+from urllib.parse import quote
+from dotenv import load_dotenv
 from typing import Dict, Any
 
+# 加载环境变量
+load_dotenv()
+
+class Config:
+    """应用配置类"""
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    
+    # PostgreSQL配置
+    POSTGRES_HOST = os.environ.get('POSTGRES_HOST', 'localhost')
+    POSTGRES_PORT = os.environ.get('POSTGRES_PORT', '5432')
+    POSTGRES_DB = os.environ.get('POSTGRES_DB', 'flask_api_db')
+    POSTGRES_USER = os.environ.get('POSTGRES_USER', 'postgres')
+    POSTGRES_PASSWORD = os.environ.get('POSTGRES_PASSWORD', 'password')
+    
+    # MySQL配置
+    MYSQL_HOST = os.environ.get('MYSQL_HOST', 'localhost')
+    MYSQL_PORT = os.environ.get('MYSQL_PORT', '3306')
+    MYSQL_DB = os.environ.get('MYSQL_DB', 'flask_api_db')
+    MYSQL_USER = os.environ.get('MYSQL_USER', 'root')
+    MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', 'password')
+    
+    # Redis配置
+    REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+    REDIS_PORT = int(os.environ.get('REDIS_PORT', '6379'))
+    REDIS_DB = int(os.environ.get('REDIS_DB', '0'))
+    REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD', None)
+    
+    # 默认使用PostgreSQL作为主数据库，可通过DATABASE_URL整体覆盖
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+        f'postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # 数据库连接池配置（gthread模式下由gunicorn.conf.py按线程数设置默认值）
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_pre_ping': True
+    }
+    
+    # 反向代理层数（nginx后部署时设为1，才能拿到真实客户端IP）
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', '0'))
+    
+    # 接口限流配置：计数存储在Redis中，由Lua脚本原子地维护滑动窗口，所有worker和副本共享
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or \
+        f"redis://{':' + quote(REDIS_PASSWORD, safe='') + '@' if REDIS_PASSWORD else ''}{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+    RATELIMIT_STRATEGY = 'moving-window'
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '600 per minute')
+    RATELIMIT_HEADERS_ENABLED = True
+    # Redis不可用时放行请求，避免限流拖垮整个服务
+    RATELIMIT_SWALLOW_ERRORS = True
+    # 昂贵操作在限流窗口中的计数权重，普通请求计1
+    RATELIMIT_COSTS = {
+        'search': int(os.environ.get('RATELIMIT_COST_SEARCH', '10'))
+    }
+    
+    # 模型缓存过期时间（秒）
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', '3600'))
+    # 每个worker定时清理缓存发件箱的间隔（秒），0表示不启用，只靠 flask cache drain-outbox
+    CACHE_OUTBOX_DRAIN_INTERVAL = float(os.environ.get('CACHE_OUTBOX_DRAIN_INTERVAL', '30'))
+    
+    # 缓存预热配置：是否在启动后第一个请求时后台预热、预热的热点用户数、
+    # 统计访问记录的时间窗口（小时）、每批查询的用户数、每秒最多加载的用户数
+    CACHE_WARMUP_ON_BOOT = os.environ.get('CACHE_WARMUP_ON_BOOT', 'false').lower() == 'true'
+    CACHE_WARMUP_LIMIT = int(os.environ.get('CACHE_WARMUP_LIMIT', '10000'))
+    CACHE_WARMUP_WINDOW = int(os.environ.get('CACHE_WARMUP_WINDOW', '24'))
+    CACHE_WARMUP_CHUNK = int(os.environ.get('CACHE_WARMUP_CHUNK', '500'))
+    CACHE_WARMUP_RATE = int(os.environ.get('CACHE_WARMUP_RATE', '2000'))
+    
+    # 订单汇总任务只处理更新时间早于当前时间减去该值（秒）的订单，给长事务留出提交余量
+    ORDER_ROLLUP_LAG = int(os.environ.get('ORDER_ROLLUP_LAG', '60'))
+    # 订单统计接口单次查询的最大桶数
+    ORDER_STATS_MAX_BUCKETS = int(os.environ.get('ORDER_STATS_MAX_BUCKETS', '1000'))
+    
+    # 幂等键配置：响应保存时长、处理中锁的超时时间、并发重复请求的最长等待时间（秒）
+    # 等待期间占用一个worker（线程），同步worker数量有限，等待时间不宜过长
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', '86400'))
+    IDEMPOTENCY_LOCK_TTL = int(os.environ.get('IDEMPOTENCY_LOCK_TTL', '30'))
+    IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', '2'))
+    
+    # 管理接口令牌，未配置时管理接口和按请求头开启分析均不可用
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # 请求级SQL/Redis分析配置（请求头 X-Profile: <ADMIN_TOKEN> 或按比例采样开启）
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'true').lower() == 'true'
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', '0'))
+    PROFILER_SLOW_MS = float(os.environ.get('PROFILER_SLOW_MS', '200'))
+    PROFILER_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILER_N_PLUS_ONE_THRESHOLD', '5'))
+    PROFILER_BUFFER_SIZE = int(os.environ.get('PROFILER_BUFFER_SIZE', '100'))
+    PROFILER_EXPLAIN_LIMIT = int(os.environ.get('PROFILER_EXPLAIN_LIMIT', '5'))
+
 class DatabaseConfig:
     """数据库配置类"""
     
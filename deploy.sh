@@ -139,13 +139,9 @@ check_services() {
 
 # 数据库迁移
 run_migrations() {
+    local compose_file=${1:-docker-compose.prod.yml}
     log_info "运行数据库迁移..."
-    docker-compose -f docker-compose.prod.yml exec flask-app python -c "
-from app import app, db
-with app.app_context():
-    db.create_all()
-    print('数据库表创建完成')
-"
+    docker-compose -f $compose_file exec -T flask-app flask db upgrade
     log_success "数据库迁移完成"
 }
 
@@ -204,6 +200,7 @@ case "${1:-deploy}" in
         build_image
         stop_services "docker-compose.simple.yml"
         start_services "docker-compose.simple.yml"
+        run_migrations "docker-compose.simple.yml"
         show_info
         ;;
     "deploy-full")
@@ -212,6 +209,7 @@ case "${1:-deploy}" in
         build_image
         stop_services "docker-compose.prod.yml"
         start_services "docker-compose.prod.yml"
+        run_migrations "docker-compose.prod.yml"
         show_info
         ;;
     "deploy-monitoring")
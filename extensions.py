@@ -0,0 +1,48 @@
+"""
+Flask扩展实例
+扩展对象在此创建但不绑定应用，由应用工厂通过init_app完成初始化
+"""
+
+from flask import current_app
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_migrate import Migrate
+from werkzeug.local import LocalProxy
+import redis
+
+from profiler import ProfilingRedis
+
+# 数据库迁移
+migrate = Migrate()
+
+def rate_limit_key() -> str:
+    """限流计数键：按客户端IP计数
+    
+    项目中没有API Key认证，客户端自报的 X-API-Key 等请求头可以随意更换，不能作为计数依据；
+    部署在反向代理之后时需配置 PROXY_FIX_X_FOR 才能拿到真实IP
+    """
+    return 'ip:' + get_remote_address()
+
+# 接口限流，默认限额按端点分别计数
+limiter = Limiter(key_func=rate_limit_key)
+
+def request_cost(kind: str) -> int:
+    """获取某类操作的限流计数权重，未配置的操作计1"""
+    return current_app.config['RATELIMIT_COSTS'].get(kind, 1)
+
+def get_redis() -> redis.Redis:
+    """获取当前应用的Redis客户端，首次使用时才创建"""
+    client = current_app.extensions.get('redis')
+    if client is None:
+        client = ProfilingRedis(
+            host=current_app.config['REDIS_HOST'],
+            port=current_app.config['REDIS_PORT'],
+            db=current_app.config['REDIS_DB'],
+            password=current_app.config['REDIS_PASSWORD'],
+            decode_responses=True
+        )
+        current_app.extensions['redis'] = client
+    return client
+
+# 按应用延迟创建的Redis客户端代理，导入时不建立任何连接
+redis_client = LocalProxy(get_redis)
@@ -0,0 +1,39 @@
+"""
+Gunicorn配置文件
+启用preload_app：应用只在master进程中导入一次，worker通过fork继承，
+因此--max-requests触发的worker重启不需要重新导入和初始化应用
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+
+# 每个worker内的线程数，大于1时使用gthread worker，同一worker可同时处理这么多个请求；
+# 默认1，即原来的同步worker
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+if threads > 1:
+    # 每个线程同一时间最多占用一个会话连接，连接池按线程数分配，只为发件箱等独立连接留少量余量，
+    # 保证 workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW) 不超过PostgreSQL的max_connections
+    # （应用在master进程中才导入，此处设置的默认值会被config.py读到）
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    os.environ.setdefault('DB_MAX_OVERFLOW', '2')
+timeout = 120
+keepalive = 2
+max_requests = 1000
+max_requests_jitter = 100
+preload_app = True
+
+def post_fork(server, worker):
+    """fork之后丢弃从master继承的连接池，每个worker使用自己的连接"""
+    app = worker.app.wsgi()
+    
+    from models import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+    
+    redis_client = app.extensions.get('redis')
+    if redis_client is not None:
+        redis_client.connection_pool.reset()
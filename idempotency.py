@@ -0,0 +1,122 @@
+"""
+POST接口幂等性支持
+客户端通过 Idempotency-Key 请求头标识一次逻辑请求，首次响应保存在Redis中，
+重试请求直接回放保存的响应；并发的重复请求等待首个请求完成后回放，不会再次访问数据库
+"""
+
+from flask import current_app, jsonify, make_response, request
+from functools import wraps
+from redis.exceptions import LockError, RedisError
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import time
+
+from extensions import rate_limit_key, redis_client
+
+# 轮询首个请求结果的间隔（秒）
+POLL_INTERVAL = 0.05
+
+def idempotency_scope(key: str) -> str:
+    """幂等键按端点和调用方隔离，不同客户端使用相同的键互不影响"""
+    raw = f'{request.endpoint}:{rate_limit_key()}:{key}'
+    return 'idempotency:' + hashlib.sha256(raw.encode()).hexdigest()
+
+def request_fingerprint() -> str:
+    """请求体摘要，用于发现复用同一个键提交不同内容的请求"""
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+def load_response(scope: str) -> Optional[Dict[str, Any]]:
+    """读取已保存的响应"""
+    stored = redis_client.get(f'{scope}:response')
+    return json.loads(stored) if stored else None
+
+def replay(stored: Dict[str, Any], fingerprint: str):
+    """回放已保存的响应"""
+    if stored['fingerprint'] != fingerprint:
+        return jsonify({
+            'success': False,
+            'error': 'Idempotency-Key已用于内容不同的请求'
+        }), 422
+
+    response = make_response(stored['body'], stored['status'])
+    response.headers['Content-Type'] = stored['content_type']
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def release_lock(lock):
+    """释放处理中锁，锁已过期或Redis不可用时忽略，锁会在超时后自动失效"""
+    try:
+        lock.release()
+    except (LockError, RedisError):
+        pass
+
+def idempotent(view: Callable) -> Callable:
+    """为POST接口启用Idempotency-Key支持，未携带该请求头时行为不变"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+
+        if len(key) > 255:
+            return jsonify({
+                'success': False,
+                'error': 'Idempotency-Key长度不能超过255'
+            }), 400
+
+        config = current_app.config
+        scope = idempotency_scope(key)
+        fingerprint = request_fingerprint()
+
+        try:
+            stored = load_response(scope)
+            if stored:
+                return replay(stored, fingerprint)
+
+            lock = redis_client.lock(f'{scope}:lock', timeout=config['IDEMPOTENCY_LOCK_TTL'])
+            acquired = lock.acquire(blocking=False)
+            # 相同的请求正在处理，等待其结果后回放；等待期间占用当前worker（线程），
+            # 因此IDEMPOTENCY_WAIT不宜设置过长
+            deadline = time.monotonic() + config['IDEMPOTENCY_WAIT']
+            while not acquired:
+                if time.monotonic() >= deadline:
+                    return jsonify({
+                        'success': False,
+                        'error': '相同Idempotency-Key的请求正在处理中，请稍后重试'
+                    }), 409
+                time.sleep(POLL_INTERVAL)
+                stored = load_response(scope)
+                if stored:
+                    return replay(stored, fingerprint)
+                # 首个请求返回5xx（不保存）并释放锁后，由等待的请求接手执行
+                acquired = lock.acquire(blocking=False)
+
+            # 加锁后再检查一次：首个请求可能在上面的检查之后、加锁之前保存了响应并释放了锁
+            stored = load_response(scope)
+            if stored:
+                release_lock(lock)
+                return replay(stored, fingerprint)
+        except RedisError as e:
+            # Redis不可用时退化为普通请求
+            print(f"幂等键检查失败: {e}")
+            return view(*args, **kwargs)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+            # 5xx不保存，客户端重试时可以重新执行
+            if response.status_code < 500:
+                try:
+                    redis_client.setex(f'{scope}:response', config['IDEMPOTENCY_TTL'], json.dumps({
+                        'status': response.status_code,
+                        'content_type': response.content_type,
+                        'body': response.get_data(as_text=True),
+                        'fingerprint': fingerprint
+                    }))
+                except RedisError as e:
+                    print(f"幂等响应保存失败: {e}")
+            return response
+        finally:
+            release_lock(lock)
+
+    return wrapper
@@ -47,7 +47,8 @@ echo "📋 下一步操作："
 echo "1. 激活conda环境: conda activate flask-api-project"
 echo "2. 配置.env文件中的数据库连接信息"
 echo "3. 启动数据库服务（使用Docker或手动安装）"
-echo "4. 运行应用: python run.py"
+echo "4. 运行数据库迁移: flask db upgrade"
+echo "5. 运行应用: python run.py"
 echo ""
 echo "🌐 应用启动后访问: http://localhost:5000"
 echo "📊 API健康检查: http://localhost:5000/api/health"
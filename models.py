@@ -4,8 +4,10 @@
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Column, Numeric
 from datetime import datetime
-from typing import Dict, Any, Optional
+from decimal import Decimal
+from typing import Dict, Any, List, Optional
 
 # 全局数据库实例
 db = SQLAlchemy()
@@ -13,16 +15,37 @@ db = SQLAlchemy()
 class BaseModel:
     """基础模型类，提供通用方法"""
     
+    @staticmethod
+    def serialize_value(column, value: Any) -> Any:
+        """将列的值转换为可JSON序列化的形式"""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if value is not None and isinstance(column.type, Numeric) and column.type.scale is not None:
+            # 按列精度格式化，提交前后（未刷新/已刷新）序列化结果一致
+            return str(Decimal(str(value)).quantize(Decimal(10) ** -column.type.scale))
+        return value
+    
     def to_dict(self) -> Dict[str, Any]:
         """将模型转换为字典"""
-        result = {}
-        for column in self.__table__.columns:
-            value = getattr(self, column.name)
-            if isinstance(value, datetime):
-                result[column.name] = value.isoformat()
-            else:
-                result[column.name] = value
-        return result
+        return {
+            column.name: self.serialize_value(column, getattr(self, column.name))
+            for column in self.__table__.columns
+        }
+    
+    @classmethod
+    def select_columns(cls, fields: Optional[List[str]] = None) -> List[Column]:
+        """字段名对应的列，未指定字段时返回全部列"""
+        if fields is None:
+            return list(cls.__table__.columns)
+        return [cls.__table__.columns[field] for field in fields]
+    
+    @classmethod
+    def row_to_dict(cls, row, columns: Optional[List[Column]] = None) -> Dict[str, Any]:
+        """将按 select(*columns) 查询到的行元组转换为与to_dict()格式相同的字典，columns默认为全部列"""
+        return {
+            column.name: cls.serialize_value(column, value)
+            for column, value in zip(columns or cls.__table__.columns, row)
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]):
@@ -58,9 +81,30 @@ class Product(db.Model, BaseModel):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # 分类汇总刷新最低/最高价时使用
+        db.Index('ix_products_category_price', 'category', 'price'),
+    )
+    
     def __repr__(self) -> str:
         return f'<Product {self.name}>'
 
+class ProductCategoryStats(db.Model, BaseModel):
+    """产品分类汇总 - 随产品写入增量维护，空字符串表示未分类"""
+    __tablename__ = 'product_category_stats'
+    
+    category = db.Column(db.String(50), primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+    stock_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    price_sum = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    price_min = db.Column(db.Numeric(10, 2), nullable=True)
+    price_max = db.Column(db.Numeric(10, 2), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f'<ProductCategoryStats {self.category}>'
+
 class Order(db.Model, BaseModel):
     """订单模型 - 存储在PostgreSQL中"""
     __tablename__ = 'orders'
@@ -77,9 +121,46 @@ class Order(db.Model, BaseModel):
     # 关系
     user = db.relationship('User', backref=db.backref('orders', lazy=True))
     
+    __table_args__ = (
+        # 订单汇总任务按更新时间增量扫描、按创建时间重算时间桶
+        db.Index('ix_orders_updated_at', 'updated_at'),
+        db.Index('ix_orders_created_at', 'created_at'),
+    )
+    
     def __repr__(self) -> str:
         return f'<Order {self.id}>'
 
+class OrderRollupMixin(BaseModel):
+    """订单时间桶汇总的公共字段，status为空字符串表示无状态"""
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+class OrderHourlyRollup(db.Model, OrderRollupMixin):
+    """订单按小时、状态汇总"""
+    __tablename__ = 'order_hourly_rollups'
+    
+    def __repr__(self) -> str:
+        return f'<OrderHourlyRollup {self.bucket_start} {self.status}>'
+
+class OrderDailyRollup(db.Model, OrderRollupMixin):
+    """订单按天、状态汇总"""
+    __tablename__ = 'order_daily_rollups'
+    
+    def __repr__(self) -> str:
+        return f'<OrderDailyRollup {self.bucket_start} {self.status}>'
+
+class RollupWatermark(db.Model, BaseModel):
+    """增量汇总任务的水位线：已处理到的更新时间"""
+    __tablename__ = 'rollup_watermarks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f'<RollupWatermark {self.name}: {self.value}>'
+
 class CacheData(db.Model, BaseModel):
     """缓存数据模型 - 存储在MySQL中（可选）"""
     __tablename__ = 'cache_data'
@@ -93,6 +174,17 @@ class CacheData(db.Model, BaseModel):
     def __repr__(self) -> str:
         return f'<CacheData {self.key}>'
 
+class CacheOutbox(db.Model, BaseModel):
+    """缓存发件箱 - 记录Redis更新失败后需要重试删除的缓存键"""
+    __tablename__ = 'cache_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f'<CacheOutbox {self.key}>'
+
 class LogEntry(db.Model, BaseModel):
     """日志条目模型 - 存储在MySQL中"""
     __tablename__ = 'log_entries'
@@ -106,5 +198,10 @@ class LogEntry(db.Model, BaseModel):
     user_agent = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # 缓存预热从日志表统计热点用户时按模块和时间范围查询，避免全表扫描
+        db.Index('ix_log_entries_module_created_at', 'module', 'created_at'),
+    )
+    
     def __repr__(self) -> str:
         return f'<LogEntry {self.level}: {self.message[:50]}>'
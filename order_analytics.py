@@ -0,0 +1,226 @@
+"""
+订单分析
+按小时、天和订单状态维护汇总表，由带水位线的批处理任务增量更新：
+每次只扫描上次水位线之后更新过的订单，重算它们所在的时间桶，统计接口只读汇总表
+"""
+
+from flask import Flask, current_app
+from sqlalchemy import delete, func, insert, select
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import click
+
+from models import db, Order, OrderHourlyRollup, OrderDailyRollup, RollupWatermark
+
+# 水位线名称
+WATERMARK_NAME = 'orders'
+
+# 支持的时间桶及对应的汇总表
+BUCKET_MODELS = {
+    'hour': OrderHourlyRollup,
+    'day': OrderDailyRollup
+}
+
+def truncate(value: datetime, bucket: str) -> datetime:
+    """时间向下取整到桶的起点"""
+    if bucket == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def bucket_step(bucket: str) -> timedelta:
+    return timedelta(hours=1) if bucket == 'hour' else timedelta(days=1)
+
+def get_watermark() -> Optional[datetime]:
+    row = db.session.get(RollupWatermark, WATERMARK_NAME)
+    return row.value if row else None
+
+def _rebuild_hours(hours: Iterable[datetime]):
+    """按订单表重算指定小时桶"""
+    for hour in sorted(hours):
+        rows = db.session.execute(
+            select(
+                func.coalesce(Order.status, '').label('status'),
+                func.count(Order.id).label('order_count'),
+                func.coalesce(func.sum(Order.total_amount), 0).label('total_amount')
+            ).where(
+                Order.created_at >= hour,
+                Order.created_at < hour + timedelta(hours=1)
+            ).group_by(func.coalesce(Order.status, ''))
+        ).all()
+        db.session.execute(delete(OrderHourlyRollup).where(OrderHourlyRollup.bucket_start == hour))
+        if rows:
+            db.session.execute(
+                insert(OrderHourlyRollup),
+                [dict(row._mapping, bucket_start=hour) for row in rows]
+            )
+
+def _rebuild_days(days: Iterable[datetime]):
+    """由小时汇总合并出指定天桶"""
+    for day in sorted(days):
+        rows = db.session.execute(
+            select(
+                OrderHourlyRollup.status,
+                func.sum(OrderHourlyRollup.order_count).label('order_count'),
+                func.sum(OrderHourlyRollup.total_amount).label('total_amount')
+            ).where(
+                OrderHourlyRollup.bucket_start >= day,
+                OrderHourlyRollup.bucket_start < day + timedelta(days=1)
+            ).group_by(OrderHourlyRollup.status)
+        ).all()
+        db.session.execute(delete(OrderDailyRollup).where(OrderDailyRollup.bucket_start == day))
+        if rows:
+            db.session.execute(
+                insert(OrderDailyRollup),
+                [dict(row._mapping, bucket_start=day) for row in rows]
+            )
+
+def rebuild_range(start: datetime, end: datetime) -> int:
+    """重算 [start, end) 内的全部时间桶（用于初始化和修正订单删除），返回小时桶数量"""
+    hours = []
+    hour = truncate(start, 'hour')
+    while hour < end:
+        hours.append(hour)
+        hour += timedelta(hours=1)
+    _rebuild_hours(hours)
+    _rebuild_days({truncate(hour, 'day') for hour in hours})
+    db.session.commit()
+    return len(hours)
+
+def run_rollup(now: Optional[datetime] = None) -> Tuple[int, datetime]:
+    """增量汇总一批订单，返回重算的小时桶数量和新的水位线
+
+    只处理更新时间早于 now - ORDER_ROLLUP_LAG 的订单，给未提交的长事务留出余量
+    """
+    upper = (now or datetime.utcnow()) - timedelta(seconds=current_app.config['ORDER_ROLLUP_LAG'])
+    watermark = get_watermark()
+
+    # 首次运行没有水位线，扫描全部订单完成初始化
+    query = select(Order.created_at)
+    if watermark is not None:
+        query = query.where(Order.updated_at > watermark, Order.updated_at <= upper)
+
+    hours: Set[datetime] = set()
+    for created_at in db.session.execute(query.execution_options(yield_per=1000)).scalars():
+        if created_at is not None:
+            hours.add(truncate(created_at, 'hour'))
+
+    _rebuild_hours(hours)
+    _rebuild_days({truncate(hour, 'day') for hour in hours})
+
+    row = db.session.get(RollupWatermark, WATERMARK_NAME)
+    if row is None:
+        db.session.add(RollupWatermark(name=WATERMARK_NAME, value=upper))
+    else:
+        row.value = upper
+    db.session.commit()
+    return len(hours), upper
+
+def _bucket_rows(model, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """读取汇总表，按桶合并各状态"""
+    rows = model.query.filter(model.bucket_start >= start, model.bucket_start < end) \
+        .order_by(model.bucket_start, model.status).all()
+
+    buckets: Dict[datetime, Dict[str, Any]] = {}
+    for row in rows:
+        bucket = buckets.setdefault(row.bucket_start, {
+            'bucket_start': row.bucket_start.isoformat(),
+            'order_count': 0,
+            'total_amount': Decimal(0),
+            'statuses': {}
+        })
+        # 状态为空的订单在汇总表中记为空字符串，响应中沿用该键（键必须都是字符串，jsonify才能排序）
+        bucket['statuses'][row.status] = {
+            'order_count': row.order_count,
+            'total_amount': str(row.total_amount)
+        }
+        bucket['order_count'] += row.order_count
+        bucket['total_amount'] += row.total_amount
+
+    for bucket in buckets.values():
+        bucket['total_amount'] = str(bucket['total_amount'])
+    return list(buckets.values())
+
+def get_order_stats(start: datetime, end: datetime, bucket: str) -> Dict[str, Any]:
+    """读取 [start, end) 内按桶、状态汇总的订单统计"""
+    start = truncate(start, bucket)
+    watermark = get_watermark()
+    return {
+        'bucket': bucket,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'watermark': watermark.isoformat() if watermark else None,
+        'buckets': _bucket_rows(BUCKET_MODELS[bucket], start, end)
+    }
+
+def brute_force_stats(start: datetime, end: datetime, bucket: str) -> Dict[Tuple[datetime, str], Tuple[int, Decimal]]:
+    """直接扫描订单表在Python中汇总，用于校验汇总表（start、end需已对齐到桶边界）"""
+    result: Dict[Tuple[datetime, str], List] = defaultdict(lambda: [0, Decimal(0)])
+    orders = db.session.execute(
+        select(Order.created_at, Order.status, Order.total_amount)
+        .where(Order.created_at >= start, Order.created_at < end)
+    ).all()
+    for created_at, status, total_amount in orders:
+        entry = result[(truncate(created_at, bucket), status or '')]
+        entry[0] += 1
+        entry[1] += Decimal(str(total_amount))
+    return {key: (count, amount) for key, (count, amount) in result.items()}
+
+def verify_range(start: datetime, end: datetime, bucket: str) -> List[str]:
+    """比较汇总表与暴力重算结果，返回差异描述（范围按桶边界向外对齐）"""
+    model = BUCKET_MODELS[bucket]
+    start = truncate(start, bucket)
+    if truncate(end, bucket) != end:
+        end = truncate(end, bucket) + bucket_step(bucket)
+    expected = brute_force_stats(start, end, bucket)
+    actual = {
+        (row.bucket_start, row.status): (row.order_count, Decimal(str(row.total_amount)))
+        for row in model.query.filter(model.bucket_start >= start, model.bucket_start < end)
+    }
+    differences = []
+    for key in sorted(set(expected) | set(actual)):
+        if expected.get(key) != actual.get(key):
+            differences.append(f'{key[0].isoformat()} {key[1] or "-"}: 期望 {expected.get(key)}，实际 {actual.get(key)}')
+    return differences
+
+def parse_datetime(value: str) -> datetime:
+    """解析ISO格式时间（按UTC），支持只有日期的写法"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def init_order_analytics(app: Flask):
+    """注册订单汇总命令: flask analytics rollup-orders / rebuild-orders / verify-orders"""
+    @app.cli.group('analytics')
+    def analytics_group():
+        """订单分析汇总命令"""
+
+    @analytics_group.command('rollup-orders')
+    def rollup_orders_command():
+        """增量汇总水位线之后更新的订单（建议每分钟执行）"""
+        count, watermark = run_rollup()
+        click.echo(f'已重算 {count} 个小时桶，水位线: {watermark.isoformat()}')
+
+    @analytics_group.command('rebuild-orders')
+    @click.option('--from', 'start', required=True, help='开始时间（ISO格式）')
+    @click.option('--to', 'end', default=None, help='结束时间（ISO格式），默认当前时间')
+    def rebuild_orders_command(start: str, end: Optional[str]):
+        """全量重算时间范围内的汇总"""
+        count = rebuild_range(parse_datetime(start), parse_datetime(end) if end else datetime.utcnow())
+        click.echo(f'已重算 {count} 个小时桶')
+
+    @analytics_group.command('verify-orders')
+    @click.option('--from', 'start', required=True, help='开始时间（ISO格式）')
+    @click.option('--to', 'end', default=None, help='结束时间（ISO格式），默认当前时间')
+    def verify_orders_command(start: str, end: Optional[str]):
+        """与订单表暴力重算结果比较，存在差异时返回非零"""
+        start_at = parse_datetime(start)
+        end_at = parse_datetime(end) if end else datetime.utcnow()
+        differences = verify_range(start_at, end_at, 'hour') + verify_range(start_at, end_at, 'day')
+        for difference in differences:
+            click.echo(f'❌ {difference}')
+        if differences:
+            raise SystemExit(1)
+        click.echo('✅ 汇总表与订单表一致')
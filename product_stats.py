@@ -0,0 +1,225 @@
+"""
+产品分类统计
+按 Product.category 维护汇总表（数量、在售数量、库存总量、价格总和/最低/最高），
+产品写入时在同一事务内按增量更新，另提供全量重算命令修正可能的偏差
+"""
+
+from flask import Flask
+from sqlalchemy import case, delete, event, func, inspect, insert, select, text, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import click
+
+from models import db, Product, ProductCategoryStats
+
+# 增量维护的累加字段
+COUNTER_FIELDS = ('product_count', 'available_count', 'stock_sum', 'price_sum')
+
+# 影响汇总的产品字段
+TRACKED_ATTRS = ('category', 'price', 'stock_quantity', 'is_available')
+
+# 汇总表中用空字符串表示未分类
+UNCATEGORIZED = ''
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    """属性被修改时先加载旧值（active_history），保证能计算出准确的增量"""
+    return value
+
+for _attr in TRACKED_ATTRS:
+    event.listen(getattr(Product, _attr), 'set', _keep_old_value, active_history=True, retval=True)
+
+def _old_value(instance, attr: str) -> Any:
+    """flush前已持久化的属性值"""
+    history = inspect(instance).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+def _contribution(category: Optional[str], price, stock, available, sign: int) -> Dict[str, Any]:
+    """一个产品对所在分类各累加字段的贡献"""
+    return {
+        'category': category or UNCATEGORIZED,
+        'product_count': sign,
+        'available_count': sign if available else 0,
+        'stock_sum': sign * (stock or 0),
+        'price_sum': sign * Decimal(str(price or 0))
+    }
+
+def _upsert(connection, category: str, deltas: Dict[str, Any]):
+    """累加一个分类的增量，行不存在时插入"""
+    values = dict(deltas, category=category, updated_at=datetime.utcnow())
+    table = ProductCategoryStats.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql.insert(table) if dialect == 'postgresql' else sqlite.insert(table)).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.category],
+            set_={field: table.c[field] + stmt.excluded[field] for field in COUNTER_FIELDS}
+            | {'updated_at': stmt.excluded.updated_at}
+        )
+        connection.execute(stmt)
+    elif dialect == 'mysql':
+        stmt = mysql.insert(table).values(values)
+        stmt = stmt.on_duplicate_key_update(
+            {field: table.c[field] + stmt.inserted[field] for field in COUNTER_FIELDS}
+            | {'updated_at': stmt.inserted.updated_at}
+        )
+        connection.execute(stmt)
+    else:
+        result = connection.execute(
+            update(table).where(table.c.category == category).values(
+                {field: table.c[field] + deltas[field] for field in COUNTER_FIELDS}
+                | {'updated_at': values['updated_at']}
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(values))
+
+def _category_filter(category: str):
+    """汇总表分类对应的产品过滤条件"""
+    if category == UNCATEGORIZED:
+        return Product.category.is_(None) | (Product.category == UNCATEGORIZED)
+    return Product.category == category
+
+def _refresh_price_range(connection, category: str):
+    """重新取分类的最低/最高价，走 (category, price) 索引"""
+    table = ProductCategoryStats.__table__
+    condition = _category_filter(category)
+    connection.execute(
+        update(table).where(table.c.category == category).values(
+            price_min=select(func.min(Product.price)).where(condition).scalar_subquery(),
+            price_max=select(func.max(Product.price)).where(condition).scalar_subquery()
+        )
+    )
+
+@event.listens_for(Session, 'before_flush')
+def _load_deleted_products(session, flush_context, instances):
+    """待删除的产品如已过期，先加载其字段，供after_flush计算增量"""
+    for instance in session.deleted:
+        if isinstance(instance, Product):
+            for attr in TRACKED_ATTRS:
+                getattr(instance, attr)
+
+@event.listens_for(Session, 'after_flush')
+def _apply_product_changes(session, flush_context):
+    """在产品写入的同一事务内更新分类汇总"""
+    contributions: List[Dict[str, Any]] = []
+    for instance in session.new:
+        if isinstance(instance, Product):
+            contributions.append(_contribution(
+                instance.category, instance.price, instance.stock_quantity, instance.is_available, 1
+            ))
+    for instance in session.dirty:
+        if isinstance(instance, Product) and session.is_modified(instance, include_collections=False):
+            contributions.append(_contribution(
+                _old_value(instance, 'category'), _old_value(instance, 'price'),
+                _old_value(instance, 'stock_quantity'), _old_value(instance, 'is_available'), -1
+            ))
+            contributions.append(_contribution(
+                instance.category, instance.price, instance.stock_quantity, instance.is_available, 1
+            ))
+    for instance in session.deleted:
+        if isinstance(instance, Product):
+            contributions.append(_contribution(
+                _old_value(instance, 'category'), _old_value(instance, 'price'),
+                _old_value(instance, 'stock_quantity'), _old_value(instance, 'is_available'), -1
+            ))
+    if not contributions:
+        return
+
+    deltas: Dict[str, Dict[str, Any]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for contribution in contributions:
+        for field in COUNTER_FIELDS:
+            deltas[contribution['category']][field] += contribution[field]
+
+    connection = session.connection()
+    for category in sorted(deltas):
+        _upsert(connection, category, deltas[category])
+        _refresh_price_range(connection, category)
+
+def _lock_products(query):
+    """重算期间阻止产品写入，返回加锁后的聚合查询
+
+    否则聚合之后提交的产品写入，其增量会被随后删除、插入的重算结果覆盖；
+    产品写入与其汇总增量在同一事务中，写入要么已提交并被聚合读到，要么等重算提交后再执行
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # SHARE锁与产品的增删改互斥，并等待进行中的写事务提交后才返回
+        db.session.execute(text('LOCK TABLE products IN SHARE MODE'))
+    elif dialect == 'mysql':
+        # 共享锁定读读取最新提交的数据，并锁住扫描到的产品行和间隙直到提交
+        return query.with_for_update(read=True)
+    elif dialect == 'sqlite':
+        # 先写入一次取得数据库写锁，其他连接在本事务提交前无法写入
+        db.session.execute(delete(ProductCategoryStats))
+    return query
+
+def recompute_product_stats() -> int:
+    """全量重算分类汇总，返回分类数量"""
+    category = func.coalesce(Product.category, UNCATEGORIZED)
+    rows = db.session.execute(_lock_products(
+        select(
+            category.label('category'),
+            func.count(Product.id).label('product_count'),
+            func.sum(case((Product.is_available.is_(True), 1), else_=0)).label('available_count'),
+            func.coalesce(func.sum(Product.stock_quantity), 0).label('stock_sum'),
+            func.coalesce(func.sum(Product.price), 0).label('price_sum'),
+            func.min(Product.price).label('price_min'),
+            func.max(Product.price).label('price_max')
+        ).group_by(category)
+    )).all()
+
+    now = datetime.utcnow()
+    db.session.execute(delete(ProductCategoryStats))
+    if rows:
+        db.session.execute(
+            insert(ProductCategoryStats),
+            [dict(row._mapping, updated_at=now) for row in rows]
+        )
+    db.session.commit()
+    return len(rows)
+
+def get_product_stats() -> Dict[str, Any]:
+    """读取分类汇总及全部产品合计"""
+    stats = ProductCategoryStats.query.filter(ProductCategoryStats.product_count > 0) \
+        .order_by(ProductCategoryStats.category).all()
+
+    categories = []
+    for row in stats:
+        data = row.to_dict()
+        data['category'] = row.category or None
+        data['price_avg'] = str((row.price_sum / row.product_count).quantize(Decimal('0.01')))
+        categories.append(data)
+
+    product_count = sum(row.product_count for row in stats)
+    price_sum = sum((row.price_sum for row in stats), Decimal(0))
+    prices_min = [row.price_min for row in stats if row.price_min is not None]
+    prices_max = [row.price_max for row in stats if row.price_max is not None]
+    return {
+        'categories': categories,
+        'total': {
+            'product_count': product_count,
+            'available_count': sum(row.available_count for row in stats),
+            'stock_sum': sum(row.stock_sum for row in stats),
+            'price_min': str(min(prices_min)) if prices_min else None,
+            'price_max': str(max(prices_max)) if prices_max else None,
+            'price_avg': str((price_sum / product_count).quantize(Decimal('0.01'))) if product_count else None
+        }
+    }
+
+def init_product_stats(app: Flask):
+    """注册全量重算命令: flask stats recompute-products"""
+    @app.cli.group('stats')
+    def stats_group():
+        """统计汇总维护命令"""
+
+    @stats_group.command('recompute-products')
+    def recompute_products_command():
+        """全量重算产品分类汇总"""
+        click.echo(f'已重算 {recompute_product_stats()} 个分类')
@@ -0,0 +1,209 @@
+"""
+请求级SQL/Redis性能分析
+按请求头或采样比例开启，记录一个请求内执行的每条SQL（耗时、行数）和Redis命令，
+检测N+1查询模式，并把慢请求连同查询计划写入Redis中的定长环形缓冲区
+"""
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hmac
+import json
+import random
+import redis
+import time
+
+# 慢请求环形缓冲区的Redis键
+SLOW_REQUESTS_KEY = 'profiler:slow_requests'
+
+# 各数据库查看执行计划的语句前缀
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN '
+}
+
+class RequestProfile:
+    """单个请求的分析数据"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.queries: List[Dict[str, Any]] = []
+        self.redis_commands: List[Dict[str, Any]] = []
+
+    def add_query(self, statement: str, parameters: Any, duration: float, rowcount: int, dialect: str):
+        self.queries.append({
+            'statement': statement,
+            'parameters': parameters,
+            'duration_ms': round(duration * 1000, 3),
+            'rowcount': rowcount,
+            'dialect': dialect
+        })
+
+    def add_redis_command(self, command: str, duration: float):
+        self.redis_commands.append({
+            'command': command,
+            'duration_ms': round(duration * 1000, 3)
+        })
+
+    def n_plus_one(self, threshold: int) -> List[Dict[str, Any]]:
+        """同一条参数化SQL在一个请求内重复执行达到阈值即视为N+1"""
+        counts = Counter(query['statement'] for query in self.queries)
+        return [
+            {'statement': statement, 'count': count}
+            for statement, count in counts.items() if count >= threshold
+        ]
+
+    def to_dict(self, threshold: int) -> Dict[str, Any]:
+        return {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'reason': self.reason,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'sql_ms': round(sum(q['duration_ms'] for q in self.queries), 3),
+            'redis_ms': round(sum(c['duration_ms'] for c in self.redis_commands), 3),
+            'query_count': len(self.queries),
+            'redis_command_count': len(self.redis_commands),
+            'queries': self.queries,
+            'redis_commands': self.redis_commands,
+            'n_plus_one': self.n_plus_one(threshold),
+            'created_at': datetime.utcnow().isoformat()
+        }
+
+def current_profile() -> Optional[RequestProfile]:
+    """获取当前请求的分析对象，未开启分析时返回None"""
+    if not has_request_context():
+        return None
+    return g.get('request_profile')
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """校验管理令牌，未配置ADMIN_TOKEN时一律拒绝"""
+    expected = current_app.config.get('ADMIN_TOKEN')
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+# SQLAlchemy事件：对所有引擎生效，只在开启分析的请求中记录
+# 开始时间保存在本条语句的执行上下文上，语句执行失败时随上下文一起丢弃，不会残留在连接池的连接上
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None and context is not None:
+        context._profiler_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    started = getattr(context, '_profiler_started', None)
+    if profile is None or started is None:
+        return
+    profile.add_query(
+        statement,
+        parameters,
+        time.perf_counter() - started,
+        cursor.rowcount,
+        conn.dialect.name
+    )
+
+class ProfilingPipeline(redis.client.Pipeline):
+    """记录整条流水线耗时的Pipeline"""
+
+    def execute(self, raise_on_error: bool = True):
+        profile = current_profile()
+        if profile is None:
+            return super().execute(raise_on_error)
+        commands = ' '.join(str(args[0]) for args, _ in self.command_stack)
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            profile.add_redis_command(f'PIPELINE [{commands}]', time.perf_counter() - started)
+
+class ProfilingRedis(redis.Redis):
+    """在开启分析的请求中记录每条命令耗时的Redis客户端"""
+
+    def execute_command(self, *args, **options):
+        profile = current_profile()
+        if profile is None:
+            return super().execute_command(*args, **options)
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            profile.add_redis_command(str(args[0]), time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> ProfilingPipeline:
+        return ProfilingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+def explain_queries(queries: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """为最慢的若干条SQL获取执行计划（不执行ANALYZE，不会真正运行语句）"""
+    from models import db
+
+    plans = []
+    slowest = sorted(queries, key=lambda q: q['duration_ms'], reverse=True)[:limit]
+    with db.engine.connect() as connection:
+        for query in slowest:
+            prefix = EXPLAIN_PREFIXES.get(query['dialect'])
+            if prefix is None:
+                break
+            try:
+                rows = connection.exec_driver_sql(prefix + query['statement'], query['parameters']).fetchall()
+                plan = [' | '.join(str(value) for value in row) for row in rows]
+            except Exception as e:
+                connection.rollback()
+                plan = [f'获取执行计划失败: {e}']
+            plans.append({'statement': query['statement'], 'plan': plan})
+    return plans
+
+def _start_profile():
+    """请求开始时根据请求头或采样比例决定是否开启分析"""
+    if not current_app.config['PROFILER_ENABLED']:
+        return
+    if is_admin_token(request.headers.get('X-Profile')):
+        g.request_profile = RequestProfile('header')
+    elif random.random() < current_app.config['PROFILER_SAMPLE_RATE']:
+        g.request_profile = RequestProfile('sampled')
+
+def _finish_profile(response):
+    """请求结束时汇总分析结果，慢请求写入环形缓冲区"""
+    profile = current_profile()
+    if profile is None:
+        return response
+    g.request_profile = None  # 之后的EXPLAIN和Redis写入不再计入
+
+    threshold = current_app.config['PROFILER_N_PLUS_ONE_THRESHOLD']
+    data = profile.to_dict(threshold)
+    data['status_code'] = response.status_code
+
+    # 只有携带管理令牌开启的分析才返回摘要，采样请求来自普通客户端，不暴露内部查询信息
+    if profile.reason == 'header':
+        response.headers['X-Profile-Summary'] = (
+            f"queries={data['query_count']}; sql_ms={data['sql_ms']}; "
+            f"redis={data['redis_command_count']}; redis_ms={data['redis_ms']}; "
+            f"total_ms={data['total_ms']}; n_plus_one={len(data['n_plus_one'])}"
+        )
+
+    if data['total_ms'] >= current_app.config['PROFILER_SLOW_MS'] or data['n_plus_one']:
+        try:
+            data['plans'] = explain_queries(profile.queries, current_app.config['PROFILER_EXPLAIN_LIMIT'])
+            from extensions import redis_client
+            pipe = redis_client.pipeline()
+            pipe.lpush(SLOW_REQUESTS_KEY, json.dumps(data, default=str))
+            pipe.ltrim(SLOW_REQUESTS_KEY, 0, current_app.config['PROFILER_BUFFER_SIZE'] - 1)
+            pipe.execute()
+        except Exception as e:
+            print(f"慢请求记录失败: {e}")
+
+    return response
+
+def get_slow_requests(limit: int) -> List[Dict[str, Any]]:
+    """读取最近的慢请求记录，最新的在前"""
+    from extensions import redis_client
+    return [json.loads(item) for item in redis_client.lrange(SLOW_REQUESTS_KEY, 0, limit - 1)]
+
+def init_profiler(app: Flask):
+    """注册请求钩子"""
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
@@ -3,21 +3,23 @@ API路由定义
 提供用户、产品、订单等资源的CRUD操作
 """
 
-from flask import Blueprint, request, jsonify
-from models import db, User, Product, Order, LogEntry
-import redis
-from config import DatabaseConfig
-from datetime import datetime
-from typing import Dict, Any, Optional
+from flask import Blueprint, current_app, request, jsonify
+from models import db, User, Product, LogEntry
+from cache_warmup import cache_user, get_cached_user
+from extensions import limiter, redis_client, request_cost
+from idempotency import idempotent
+from order_analytics import BUCKET_MODELS, bucket_step, get_order_stats, parse_datetime
+from product_stats import get_product_stats
+from profiler import get_slow_requests, is_admin_token
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 import json
 
 # 创建蓝图
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# 初始化Redis连接
-redis_config = DatabaseConfig.get_redis_config()
-redis_client = redis.Redis(**redis_config)
-
 def log_request(level: str, message: str, user_id: Optional[int] = None):
     """记录请求日志到数据库"""
     try:
@@ -34,8 +36,82 @@ def log_request(level: str, message: str, user_id: Optional[int] = None):
     except Exception as e:
         print(f"日志记录失败: {e}")
 
+def unique_violation_field(error: IntegrityError, model, fields: List[str]) -> Optional[str]:
+    """识别唯一约束冲突对应的字段，无法识别时返回None
+    
+    依次匹配PostgreSQL的约束名、MySQL的索引名和SQLite的 表.列 错误信息
+    """
+    table = model.__tablename__
+    constraint = getattr(getattr(error.orig, 'diag', None), 'constraint_name', None) or ''
+    message = f'{constraint} {error.orig}'
+    for field in fields:
+        if any(name in message for name in (f'ix_{table}_{field}', f'{table}_{field}_key', f'{table}.{field}')):
+            return field
+    return None
+
+def default_limit() -> str:
+    """默认限额，按端点分别计数"""
+    return current_app.config['RATELIMIT_DEFAULT']
+
+def list_query_cost() -> int:
+    """列表查询带search参数时会做LIKE扫描，按search权重计数"""
+    return request_cost('search') if request.args.get('search') else 1
+
+def requested_fields(model) -> Optional[List[str]]:
+    """解析 ?fields=id,username 参数，未指定时返回None（全部字段）
+    
+    字段名必须是模型的列，否则抛出ValueError
+    """
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields:
+        raise ValueError('fields不能为空')
+    unknown = [field for field in fields if field not in model.__table__.columns]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    return fields
+
+def project_fields(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """从完整数据中取出指定字段，fields为None时原样返回"""
+    if fields is None:
+        return data
+    return {field: data.get(field) for field in fields}
+
+def paginate_rows(model, conditions: List[Any], page: int, per_page: int,
+                  fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """分页查询列表数据，返回数据和分页信息
+    
+    直接查询列得到行元组，不构造ORM实例，也不进入会话的identity map，
+    大per_page时每行只保留一个字典；指定fields时只查询这些列。
+    页码和每页数量的容错与Flask-SQLAlchemy的paginate一致
+    """
+    page = page if page > 0 else 1
+    per_page = per_page if per_page > 0 else 20
+    columns = model.select_columns(fields)
+    
+    total = db.session.execute(
+        select(func.count()).select_from(model).where(*conditions)
+    ).scalar()
+    rows = db.session.execute(
+        select(*columns).where(*conditions)
+        .order_by(model.id).limit(per_page).offset((page - 1) * per_page)
+    )
+    items = [model.row_to_dict(row, columns) for row in rows]
+    
+    pages = -(-total // per_page)
+    return items, {
+        'total': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
 # 用户相关路由
 @api_bp.route('/users', methods=['GET'])
+@limiter.limit(default_limit, cost=list_query_cost)
 def get_users():
     """获取所有用户列表"""
     try:
@@ -43,32 +119,33 @@ def get_users():
         per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search', '')
         
-        query = User.query
+        try:
+            fields = requested_fields(User)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        conditions = []
         if search:
-            query = query.filter(
+            conditions.append(
                 (User.username.contains(search)) | 
                 (User.email.contains(search)) |
                 (User.full_name.contains(search))
             )
         
-        users = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        users, pagination = paginate_rows(User, conditions, page, per_page, fields)
         
         log_request('INFO', f'获取用户列表，页码: {page}')
         
         return jsonify({
             'success': True,
-            'data': [user.to_dict() for user in users.items],
+            'data': users,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': users.total,
-                'pages': users.pages,
-                'has_next': users.has_next,
-                'has_prev': users.has_prev
+                **pagination
             }
         })
         
@@ -80,6 +157,7 @@ def get_users():
         }), 500
 
 @api_bp.route('/users', methods=['POST'])
+@idempotent
 def create_user():
     """创建新用户"""
     try:
@@ -94,20 +172,7 @@ def create_user():
                     'error': f'{field}是必填项'
                 }), 400
         
-        # 检查用户名和邮箱是否已存在
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({
-                'success': False,
-                'error': '用户名已存在'
-            }), 400
-        
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({
-                'success': False,
-                'error': '邮箱已存在'
-            }), 400
-        
-        # 创建新用户
+        # 创建新用户，用户名和邮箱的唯一性由数据库唯一索引保证
         user = User(
             username=data['username'],
             email=data['email'],
@@ -116,17 +181,27 @@ def create_user():
         )
         
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            db.session.rollback()
+            field = unique_violation_field(e, User, ['username', 'email'])
+            if field is None:
+                raise
+            return jsonify({
+                'success': False,
+                'error': '用户名已存在' if field == 'username' else '邮箱已存在'
+            }), 400
         
-        # 缓存用户信息到Redis
-        cache_key = f"user:{user.id}"
-        redis_client.setex(cache_key, 3600, json.dumps(user.to_dict()))
+        # 在提交前序列化，避免提交后属性过期再查询一次；缓存在提交后自动写入
+        user_data = user.to_dict()
+        db.session.commit()
         
-        log_request('INFO', f'创建用户成功: {user.username}', user.id)
+        log_request('INFO', f'创建用户成功: {user_data["username"]}', user_data['id'])
         
         return jsonify({
             'success': True,
-            'data': user.to_dict(),
+            'data': user_data,
             'message': '用户创建成功'
         }), 201
         
@@ -140,31 +215,43 @@ def create_user():
 
 @api_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id: int):
-    """获取指定用户详情"""
+    """获取指定用户详情
+    
+    缓存中始终保存完整的用户数据，指定fields时从完整数据中取出所需字段，
+    不同字段组合共用同一个缓存键
+    """
     try:
-        # 先从Redis缓存中查找
-        cache_key = f"user:{user_id}"
-        cached_user = redis_client.get(cache_key)
+        try:
+            fields = requested_fields(User)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        # 先从Redis缓存中查找，命中时同时记录访问次数供缓存预热使用
+        cached_user = get_cached_user(user_id)
         
         if cached_user:
-            log_request('INFO', f'从缓存获取用户: {user_id}')
+            log_request('INFO', f'从缓存获取用户: {user_id}', user_id)
             return jsonify({
                 'success': True,
-                'data': json.loads(cached_user),
+                'data': project_fields(json.loads(cached_user), fields),
                 'from_cache': True
             })
         
         # 从数据库查找
         user = User.query.get_or_404(user_id)
+        user_data = user.to_dict()
         
-        # 缓存到Redis
-        redis_client.setex(cache_key, 3600, json.dumps(user.to_dict()))
+        # 缓存到Redis并记录访问
+        cache_user(user_id, user_data)
         
-        log_request('INFO', f'从数据库获取用户: {user_id}')
+        log_request('INFO', f'从数据库获取用户: {user_id}', user_id)
         
         return jsonify({
             'success': True,
-            'data': user.to_dict(),
+            'data': project_fields(user_data, fields),
             'from_cache': False
         })
         
@@ -182,31 +269,11 @@ def update_user(user_id: int):
         user = User.query.get_or_404(user_id)
         data = request.get_json()
         
-        # 更新用户信息
+        # 更新用户信息，用户名和邮箱的唯一性由数据库唯一索引保证
         if 'username' in data:
-            # 检查用户名是否已被其他用户使用
-            existing_user = User.query.filter(
-                User.username == data['username'],
-                User.id != user_id
-            ).first()
-            if existing_user:
-                return jsonify({
-                    'success': False,
-                    'error': '用户名已被其他用户使用'
-                }), 400
             user.username = data['username']
         
         if 'email' in data:
-            # 检查邮箱是否已被其他用户使用
-            existing_user = User.query.filter(
-                User.email == data['email'],
-                User.id != user_id
-            ).first()
-            if existing_user:
-                return jsonify({
-                    'success': False,
-                    'error': '邮箱已被其他用户使用'
-                }), 400
             user.email = data['email']
         
         if 'full_name' in data:
@@ -217,17 +284,27 @@ def update_user(user_id: int):
         
         user.updated_at = datetime.utcnow()
         
-        db.session.commit()
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            db.session.rollback()
+            field = unique_violation_field(e, User, ['username', 'email'])
+            if field is None:
+                raise
+            return jsonify({
+                'success': False,
+                'error': '用户名已被其他用户使用' if field == 'username' else '邮箱已被其他用户使用'
+            }), 400
         
-        # 更新Redis缓存
-        cache_key = f"user:{user_id}"
-        redis_client.setex(cache_key, 3600, json.dumps(user.to_dict()))
+        # 在提交前序列化，避免提交后属性过期再查询一次；缓存在提交后自动更新
+        user_data = user.to_dict()
+        db.session.commit()
         
-        log_request('INFO', f'更新用户成功: {user.username}', user.id)
+        log_request('INFO', f'更新用户成功: {user_data["username"]}', user_id)
         
         return jsonify({
             'success': True,
-            'data': user.to_dict(),
+            'data': user_data,
             'message': '用户更新成功'
         })
         
@@ -246,17 +323,14 @@ def delete_user(user_id: int):
         user = User.query.get_or_404(user_id)
         username = user.username
         
-        # 删除用户的所有订单（可选，根据业务需求）
-        Order.query.filter_by(user_id=user_id).delete()
+        # 删除用户的所有订单（可选，根据业务需求），逐个删除以便同步清理订单缓存
+        for order in user.orders:
+            db.session.delete(order)
         
-        # 删除用户
+        # 删除用户，缓存在提交后自动删除
         db.session.delete(user)
         db.session.commit()
         
-        # 删除Redis缓存
-        cache_key = f"user:{user_id}"
-        redis_client.delete(cache_key)
-        
         log_request('INFO', f'删除用户成功: {username}', user_id)
         
         return jsonify({
@@ -274,6 +348,7 @@ def delete_user(user_id: int):
 
 # 产品相关路由
 @api_bp.route('/products', methods=['GET'])
+@limiter.limit(default_limit, cost=list_query_cost)
 def get_products():
     """获取产品列表"""
     try:
@@ -282,30 +357,31 @@ def get_products():
         category = request.args.get('category', '')
         search = request.args.get('search', '')
         
-        query = Product.query
+        try:
+            fields = requested_fields(Product)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        conditions = []
         if category:
-            query = query.filter(Product.category == category)
+            conditions.append(Product.category == category)
         if search:
-            query = query.filter(Product.name.contains(search))
+            conditions.append(Product.name.contains(search))
         
-        products = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        products, pagination = paginate_rows(Product, conditions, page, per_page, fields)
         
         log_request('INFO', f'获取产品列表，页码: {page}')
         
         return jsonify({
             'success': True,
-            'data': [product.to_dict() for product in products.items],
+            'data': products,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': products.total,
-                'pages': products.pages,
-                'has_next': products.has_next,
-                'has_prev': products.has_prev
+                **pagination
             }
         })
         
@@ -317,6 +393,7 @@ def get_products():
         }), 500
 
 @api_bp.route('/products', methods=['POST'])
+@idempotent
 def create_product():
     """创建新产品"""
     try:
@@ -360,6 +437,71 @@ def create_product():
             'error': str(e)
         }), 500
 
+@api_bp.route('/products/stats', methods=['GET'])
+def get_products_stats():
+    """获取按分类汇总的产品统计（读取汇总表，不扫描产品表）"""
+    try:
+        stats = get_product_stats()
+        
+        return jsonify({
+            'success': True,
+            'data': stats
+        })
+        
+    except Exception as e:
+        log_request('ERROR', f'获取产品统计失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# 订单相关路由
+@api_bp.route('/orders/stats', methods=['GET'])
+def get_orders_stats():
+    """获取按时间桶和状态汇总的订单统计（只读汇总表）"""
+    try:
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in BUCKET_MODELS:
+            return jsonify({
+                'success': False,
+                'error': 'bucket只能是hour或day'
+            }), 400
+        
+        try:
+            end = parse_datetime(request.args['to']) if request.args.get('to') else datetime.utcnow()
+            start = parse_datetime(request.args['from']) if request.args.get('from') else end - timedelta(days=30)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'from和to必须是ISO格式时间'
+            }), 400
+        
+        if start >= end:
+            return jsonify({
+                'success': False,
+                'error': 'from必须早于to'
+            }), 400
+        
+        if (end - start) / bucket_step(bucket) > current_app.config['ORDER_STATS_MAX_BUCKETS']:
+            return jsonify({
+                'success': False,
+                'error': f"时间范围过大，最多{current_app.config['ORDER_STATS_MAX_BUCKETS']}个{bucket}桶"
+            }), 400
+        
+        stats = get_order_stats(start, end, bucket)
+        
+        return jsonify({
+            'success': True,
+            'data': stats
+        })
+        
+    except Exception as e:
+        log_request('ERROR', f'获取订单统计失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Redis测试路由
 @api_bp.route('/redis/test', methods=['GET'])
 def test_redis():
@@ -408,8 +550,35 @@ def test_redis():
             'error': f'Redis连接失败: {str(e)}'
         }), 500
 
+# 管理路由
+@api_bp.route('/admin/slow-requests', methods=['GET'])
+def get_slow_request_profiles():
+    """获取最近的慢请求分析记录（含SQL、Redis命令、N+1检测和执行计划）"""
+    if not is_admin_token(request.headers.get('X-Admin-Token')):
+        return jsonify({
+            'success': False,
+            'error': '无权访问'
+        }), 403
+    
+    try:
+        limit = min(request.args.get('limit', 20, type=int), current_app.config['PROFILER_BUFFER_SIZE'])
+        profiles = get_slow_requests(limit)
+        
+        return jsonify({
+            'success': True,
+            'data': profiles,
+            'count': len(profiles)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # 健康检查路由
 @api_bp.route('/health', methods=['GET'])
+@limiter.exempt
 def health_check():
     """健康检查接口"""
     health_status = {
@@ -420,7 +589,7 @@ def health_check():
     
     # 检查PostgreSQL
     try:
-        db.engine.execute('SELECT 1')
+        db.session.execute(text('SELECT 1'))
         health_status['services']['postgresql'] = 'healthy'
     except Exception as e:
         health_status['services']['postgresql'] = f'unhealthy: {str(e)}'
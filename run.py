@@ -4,22 +4,16 @@ Flask应用启动脚本
 """
 
 import os
-from app import app, db
-from models import User, Product, Order, LogEntry
-from routes import api_bp
+from app import create_app
+from models import db, User, Product
 
-# 注册蓝图
-app.register_blueprint(api_bp)
+# 应用实例（gunicorn: run:app），表结构由迁移单独管理: flask db upgrade
+app = create_app()
 
-def init_database():
-    """初始化数据库"""
-    with app.app_context():
-        # 创建所有表
-        db.create_all()
-        
-        # 创建示例数据（仅开发环境）
-        if os.environ.get('FLASK_ENV') == 'development':
-            create_sample_data()
+@app.cli.command('seed')
+def seed_command():
+    """写入示例数据"""
+    create_sample_data()
 
 def create_sample_data():
     """创建示例数据"""
@@ -60,8 +54,10 @@ def create_sample_data():
         db.session.rollback()
 
 if __name__ == '__main__':
-    # 初始化数据库
-    init_database()
+    # 创建示例数据（仅开发环境，需先执行 flask db upgrade）
+    if os.environ.get('FLASK_ENV') == 'development':
+        with app.app_context():
+            create_sample_data()
     
     # 启动应用
     port = int(os.environ.get('PORT', 5000))
@@ -20,4 +20,7 @@ echo "🌐 访问地址: http://localhost:5000"
 echo "📊 API健康检查: http://localhost:5000/api/health"
 echo ""
 
+# 应用数据库迁移
+$HOME/miniconda3/envs/flask-api-project/bin/flask db upgrade
+
 $HOME/miniconda3/envs/flask-api-project/bin/python run.py
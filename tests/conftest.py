@@ -0,0 +1,33 @@
+"""
+测试公共夹具
+每个测试使用独立的临时SQLite数据库创建应用，关闭限流和请求分析；
+Redis不可用时缓存写入会失败并转入发件箱，不影响接口结果
+"""
+
+import pytest
+
+from app import create_app
+from config import Config
+from models import db
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        # 并发测试中多个线程同时写入，等待SQLite写锁而不是立即报错
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+        RATELIMIT_ENABLED = False
+        PROFILER_ENABLED = False
+        CACHE_OUTBOX_DRAIN_INTERVAL = 0
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
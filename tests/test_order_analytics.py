@@ -0,0 +1,66 @@
+"""
+订单汇总测试
+增量汇总（包括状态为空的订单和汇总之后修改状态、新增的订单）完成后，
+小时表和天表都应与直接扫描订单表的结果一致
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select, update
+
+from models import db, User, Order, OrderHourlyRollup
+from order_analytics import run_rollup, verify_range
+
+NOW = datetime(2024, 3, 3, 12, 0)
+START = datetime(2024, 3, 1)
+
+def order_values(user_id, created_at, status, amount):
+    # 按表插入，状态为None时写入NULL（ORM批量插入会换成列默认值）
+    return {'user_id': user_id, 'status': status, 'total_amount': Decimal(amount),
+            'created_at': created_at, 'updated_at': created_at}
+
+def set_status(order_id, status, updated_at):
+    db.session.execute(update(Order).where(Order.id == order_id).values(status=status, updated_at=updated_at))
+
+def assert_consistent():
+    assert verify_range(START, NOW, 'hour') == []
+    assert verify_range(START, NOW, 'day') == []
+
+def test_rollup_matches_orders(app):
+    user = User(username='buyer', email='buyer@example.com')
+    db.session.add(user)
+    db.session.flush()
+
+    values = []
+    for day in range(3):
+        for hour in (0, 9, 23):
+            created_at = START + timedelta(days=day, hours=hour, minutes=15)
+            if created_at >= NOW:
+                continue
+            values.append(order_values(user.id, created_at, 'pending', '10.50'))
+            values.append(order_values(user.id, created_at + timedelta(minutes=5), 'delivered', '20.00'))
+            values.append(order_values(user.id, created_at + timedelta(minutes=10), None, '5.25'))
+    db.session.execute(insert(Order.__table__), values)
+    db.session.commit()
+
+    count, watermark = run_rollup(NOW)
+    assert count == 8
+    assert OrderHourlyRollup.query.filter_by(status='').count() == 8
+    assert_consistent()
+
+    # 汇总之后修改状态（包括改为空、由空改为非空）并新增订单，下一次增量汇总需重算对应的桶
+    later = watermark + timedelta(seconds=30)
+    order_ids = db.session.execute(select(Order.id).order_by(Order.created_at)).scalars().all()
+    set_status(order_ids[0], 'cancelled', later)
+    set_status(order_ids[1], None, later)
+    set_status(order_ids[-1], 'confirmed', later)
+    db.session.execute(insert(Order.__table__), [
+        dict(order_values(user.id, START + timedelta(days=1, hours=9, minutes=40), 'shipped', '7.00'), updated_at=later)
+    ])
+    db.session.commit()
+    assert verify_range(START, NOW, 'hour') != []
+
+    count, _ = run_rollup(NOW + timedelta(minutes=5))
+    assert count == 3
+    assert_consistent()
@@ -0,0 +1,100 @@
+"""
+用户名/邮箱唯一性测试
+唯一性由数据库唯一索引保证，冲突的IntegrityError需映射为对应字段的400错误，
+包括并发提交相同用户名或邮箱的情况
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User
+from routes import unique_violation_field
+
+CONCURRENCY = 16
+
+def create_user(client, username, email):
+    return client.post('/api/users', json={'username': username, 'email': email})
+
+def create_concurrently(app, payloads):
+    """每个线程使用自己的测试客户端并发提交，返回 (状态码, 错误信息) 列表"""
+    def post(payload):
+        response = app.test_client().post('/api/users', json=payload)
+        return response.status_code, response.get_json().get('error')
+
+    with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+        return list(executor.map(post, payloads))
+
+@pytest.mark.parametrize('payload, error', [
+    ({'username': 'alice', 'email': 'other@example.com'}, '用户名已存在'),
+    ({'username': 'other', 'email': 'alice@example.com'}, '邮箱已存在'),
+])
+def test_create_duplicate_returns_400(client, payload, error):
+    assert create_user(client, 'alice', 'alice@example.com').status_code == 201
+
+    response = client.post('/api/users', json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'error': error}
+    assert User.query.count() == 1
+
+@pytest.mark.parametrize('payload, error', [
+    ({'username': 'alice'}, '用户名已被其他用户使用'),
+    ({'email': 'alice@example.com'}, '邮箱已被其他用户使用'),
+])
+def test_update_to_existing_value_returns_400(client, payload, error):
+    create_user(client, 'alice', 'alice@example.com')
+    bob_id = create_user(client, 'bob', 'bob@example.com').get_json()['data']['id']
+
+    response = client.put(f'/api/users/{bob_id}', json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'error': error}
+    bob = db.session.get(User, bob_id)
+    assert (bob.username, bob.email) == ('bob', 'bob@example.com')
+
+def test_update_keeping_own_values_succeeds(client):
+    user_id = create_user(client, 'alice', 'alice@example.com').get_json()['data']['id']
+
+    response = client.put(f'/api/users/{user_id}', json={'username': 'alice', 'email': 'alice@example.com'})
+
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('field, error', [
+    ('username', '用户名已存在'),
+    ('email', '邮箱已存在'),
+])
+def test_concurrent_duplicates_create_one_user(app, field, error):
+    payloads = [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', field: 'same' if field == 'username' else 'same@example.com'}
+        for i in range(CONCURRENCY)
+    ]
+
+    results = create_concurrently(app, payloads)
+
+    statuses = Counter(status for status, _ in results)
+    assert statuses == {201: 1, 400: CONCURRENCY - 1}
+    assert {message for status, message in results if status == 400} == {error}
+    assert User.query.count() == 1
+
+@pytest.mark.parametrize('constraint, message, field', [
+    # PostgreSQL: 唯一索引名在diag.constraint_name中
+    ('ix_users_username', 'duplicate key value violates unique constraint', 'username'),
+    ('users_email_key', 'duplicate key value violates unique constraint', 'email'),
+    # MySQL: 索引名出现在错误信息中
+    (None, "(1062, \"Duplicate entry 'a@b' for key 'users.ix_users_email'\")", 'email'),
+    # SQLite: 表.列
+    (None, 'UNIQUE constraint failed: users.username', 'username'),
+    # 其他约束不识别，由调用方继续抛出
+    (None, 'NOT NULL constraint failed: users.full_name', None),
+])
+def test_unique_violation_field(constraint, message, field):
+    class DriverError(Exception):
+        diag = SimpleNamespace(constraint_name=constraint)
+
+    error = IntegrityError('INSERT INTO users ...', {}, DriverError(message))
+
+    assert unique_violation_field(error, User, ['username', 'email']) == field